@@ -0,0 +1,128 @@
+"""
+Numeric kernels for bias analysis
+Compiled with Numba when it is installed, plain NumPy otherwise
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# fastmath without 'nnan', so the NaN checks that skip missing values survive
+FASTMATH_FLAGS = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+def _finish_stats(n, total, total_sq, total_abs):
+    """Turn running sums into (mean, std, mae, rmse)"""
+    if n == 0:
+        return np.nan, np.nan, np.nan, np.nan
+
+    mean = total / n
+    std = np.sqrt(max(total_sq - total * mean, 0.0) / (n - 1)) if n > 1 else np.nan
+    return mean, std, total_abs / n, np.sqrt(total_sq / n)
+
+
+def _bias_stats_loop(high, low):
+    """
+    Bias statistics for the high and low bias columns in a single loop
+
+    Args:
+        high: Contiguous float64 array of high temperature bias
+        low: Contiguous float64 array of low temperature bias
+
+    Returns:
+        Tuple (mean_high, std_high, mae_high, rmse_high,
+               mean_low, std_low, mae_low, rmse_low); missing values are skipped
+    """
+    n_high = 0
+    sum_high = 0.0
+    sumsq_high = 0.0
+    sumabs_high = 0.0
+    n_low = 0
+    sum_low = 0.0
+    sumsq_low = 0.0
+    sumabs_low = 0.0
+
+    for i in range(high.size):
+        h = high[i]
+        if not np.isnan(h):
+            n_high += 1
+            sum_high += h
+            sumsq_high += h * h
+            sumabs_high += abs(h)
+
+        l = low[i]
+        if not np.isnan(l):
+            n_low += 1
+            sum_low += l
+            sumsq_low += l * l
+            sumabs_low += abs(l)
+
+    return (_finish_stats(n_high, sum_high, sumsq_high, sumabs_high)
+            + _finish_stats(n_low, sum_low, sumsq_low, sumabs_low))
+
+
+def _bias_means_loop(high, low):
+    """
+    Mean high and low bias in a single loop, skipping missing values
+
+    Returns:
+        Tuple (mean_high, mean_low)
+    """
+    n_high = 0
+    sum_high = 0.0
+    n_low = 0
+    sum_low = 0.0
+
+    for i in range(high.size):
+        h = high[i]
+        if not np.isnan(h):
+            n_high += 1
+            sum_high += h
+
+        l = low[i]
+        if not np.isnan(l):
+            n_low += 1
+            sum_low += l
+
+    mean_high = sum_high / n_high if n_high > 0 else np.nan
+    mean_low = sum_low / n_low if n_low > 0 else np.nan
+    return mean_high, mean_low
+
+
+def _column_stats(values):
+    """NumPy fallback: sums for one bias column, skipping missing values"""
+    values = values[~np.isnan(values)]
+    return _finish_stats(values.size, values.sum(), np.dot(values, values),
+                         np.abs(values).sum())
+
+
+def _bias_stats_numpy(high, low):
+    """NumPy fallback for bias_stats, same return layout"""
+    return _column_stats(high) + _column_stats(low)
+
+
+def _column_mean(values):
+    """NumPy fallback: mean of one bias column, skipping missing values"""
+    values = values[~np.isnan(values)]
+    return values.mean() if values.size else np.nan
+
+
+def _bias_means_numpy(high, low):
+    """NumPy fallback for bias_means, same return layout"""
+    return _column_mean(high), _column_mean(low)
+
+
+if njit is not None:
+    _finish_stats = njit(cache=True)(_finish_stats)
+    bias_stats = njit(cache=True, fastmath=FASTMATH_FLAGS)(_bias_stats_loop)
+    bias_means = njit(cache=True, fastmath=FASTMATH_FLAGS)(_bias_means_loop)
+
+    # Warm start so the first real call does not pay the compile cost
+    bias_stats(np.zeros(2), np.zeros(2))
+    bias_means(np.zeros(2), np.zeros(2))
+else:
+    bias_stats = _bias_stats_numpy
+    bias_means = _bias_means_numpy
@@ -4,21 +4,129 @@ Bias Analysis Framework
 Calculate and analyze forecast errors using spatial consensus
 """
 
+import csv
+import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
 
+from _kernels import bias_means, bias_stats
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Column names and dtypes returned by the spatial bias query
+SPATIAL_BIAS_COLUMNS = [
+    ('city', object),
+    ('target_date', object),
+    ('forecast_horizon', np.int64),
+    ('grid_count', np.int64),
+    ('consensus_high', np.float64),
+    ('consensus_low', np.float64),
+    ('actual_high', np.float64),
+    ('actual_low', np.float64),
+]
+
+# Column names and narrow dtypes returned by the gridpoint query
+GRIDPOINT_COLUMNS = [
+    ('grid_id', object),
+    ('grid_x', np.int16),
+    ('grid_y', np.int16),
+    ('high_temp', np.float64),
+    ('low_temp', np.float64),
+    ('forecast_horizon', np.int8),
+]
+
+# Columns of the per-horizon summary report CSV
+REPORT_FIELDS = [
+    'city', 'horizon_days', 'n_days',
+    'mean_high_bias', 'mean_low_bias', 'mae_high', 'mae_low',
+    'high_bias_detected', 'low_bias_detected',
+]
+
+# Defaults for persistent bias detection
+DEFAULT_BIAS_THRESHOLD = 0.5
+DEFAULT_MIN_DAYS = 30
+
+# Indexes backing the analysis queries. spatial_consensus is a view and
+# cannot be indexed itself, so the partial index on forecasts carries the
+# view's NOT NULL filter and matches its pushed-down city/horizon/date terms.
+ANALYSIS_INDEXES = [
+    '''CREATE INDEX IF NOT EXISTS idx_forecasts_city_horizon_target
+        ON forecasts(city, forecast_horizon, target_date)
+        WHERE high_temp IS NOT NULL AND low_temp IS NOT NULL''',
+    '''CREATE INDEX IF NOT EXISTS idx_actuals_city_date
+        ON actuals(city, date)''',
+    '''CREATE INDEX IF NOT EXISTS idx_forecasts_city_target
+        ON forecasts(city, target_date)''',
+]
+
+
+def _typed_columns(rows, columns):
+    """Turn raw sqlite3 row tuples into a dict of typed NumPy columns"""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {
+        name: np.asarray(column, dtype=dtype)
+        for (name, dtype), column in zip(columns, values)
+    }
+
+
+def _write_report(output_path, results):
+    """Write summary report rows to CSV without going through pandas"""
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(results)
+
 
 class BiasAnalyzer:
     """Framework for analyzing forecast bias across spatial ensembles"""
     
-    def __init__(self, db_path='weather_forecasts.db'):
+    def __init__(self, db_path='weather_forecasts.db', read_only=False):
         self.db_path = db_path
+        self.read_only = read_only
+        
+        if read_only:
+            # Read-only readers never contend for the writer lock
+            uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, detect_types=0,
+                                         check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(db_path, detect_types=0, check_same_thread=False)
+        
+        # Plain tuple rows: no Row objects or declared-type converters on reads
+        self._conn.row_factory = None
+        
+        # Large page cache and mmap keep repeated consensus scans in memory
+        self._conn.execute('PRAGMA cache_size=-65536')
+        self._conn.execute('PRAGMA mmap_size=268435456')
+        self._conn.execute('PRAGMA temp_store=MEMORY')
+        
+        if not read_only:
+            self.ensure_indexes()
+    
+    def close(self):
+        """Close the cached database connection"""
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            conn.close()
+            self._conn = None
+    
+    def __del__(self):
+        self.close()
+    
+    def ensure_indexes(self):
+        """Create the indexes used by the analysis queries if missing"""
+        try:
+            for statement in ANALYSIS_INDEXES:
+                self._conn.execute(statement)
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not create analysis indexes: {e}")
     
     def calculate_spatial_bias(self, city, start_date, end_date, horizon=1):
         """
@@ -28,15 +136,19 @@ class BiasAnalyzer:
             city: City identifier
             start_date: Start date for analysis (YYYY-MM-DD)
             end_date: End date for analysis (YYYY-MM-DD)
-            horizon: Forecast horizon in days
+            horizon: Forecast horizon in days, or None for all horizons
             
         Returns:
             DataFrame with bias metrics
         """
-        conn = sqlite3.connect(self.db_path)
+        params = [city, start_date, end_date]
+        horizon_filter = ''
+        if horizon is not None:
+            horizon_filter = 'AND sc.forecast_horizon = ?'
+            params.append(horizon)
         
         # Query spatial consensus vs actuals
-        query = '''
+        query = f'''
         SELECT 
             sc.city,
             sc.target_date,
@@ -45,25 +157,86 @@ class BiasAnalyzer:
             sc.consensus_high,
             sc.consensus_low,
             a.high_temp as actual_high,
-            a.low_temp as actual_low,
-            (sc.consensus_high - a.high_temp) as high_bias,
-            (sc.consensus_low - a.low_temp) as low_bias
+            a.low_temp as actual_low
         FROM spatial_consensus sc
         INNER JOIN actuals a 
             ON sc.city = a.city 
             AND sc.target_date = a.date
         WHERE sc.city = ?
             AND sc.target_date BETWEEN ? AND ?
-            AND sc.forecast_horizon = ?
+            {horizon_filter}
             AND sc.grid_count >= 5
-        ORDER BY sc.target_date
+        ORDER BY sc.forecast_horizon, sc.target_date
         '''
         
-        df = pd.read_sql_query(query, conn, params=(city, start_date, end_date, horizon))
-        conn.close()
+        rows = self._conn.execute(query, params).fetchall()
+        
+        # Build typed columns directly rather than letting pandas infer them
+        data = _typed_columns(rows, SPATIAL_BIAS_COLUMNS)
+        
+        # Bias is a vectorized subtraction on the fetched columns; keeping it
+        # out of the SELECT spares SQLite per-row arithmetic and two columns
+        data['high_bias'] = data['consensus_high'] - data['actual_high']
+        data['low_bias'] = data['consensus_low'] - data['actual_low']
+        
+        return pd.DataFrame(data)
+    
+    def aggregate_spatial_bias_sql(self, city, start_date, end_date):
+        """
+        Aggregate spatial consensus bias per forecast horizon inside SQLite
+        
+        Args:
+            city: City identifier
+            start_date: Start date for analysis (YYYY-MM-DD)
+            end_date: End date for analysis (YYYY-MM-DD)
+            
+        Returns:
+            DataFrame with one row of bias metrics per forecast horizon
+        """
+        columns, rows = self._aggregate_spatial_bias_rows(city, start_date, end_date)
+        df = pd.DataFrame(rows, columns=columns)
+        
+        # SQLite has no SQRT by default, so finish RMSE here
+        df['rmse_high'] = np.sqrt(df.pop('msq_high').astype(np.float64))
+        df['rmse_low'] = np.sqrt(df.pop('msq_low').astype(np.float64))
         
         return df
     
+    def _aggregate_spatial_bias_rows(self, city, start_date, end_date):
+        """Column names and raw rows of the per-horizon bias aggregate"""
+        query = '''
+        SELECT 
+            sc.forecast_horizon,
+            COUNT(*) as n_days,
+            AVG(sc.consensus_high - a.high_temp) as mean_high_bias,
+            AVG(ABS(sc.consensus_high - a.high_temp)) as mae_high,
+            AVG((sc.consensus_high - a.high_temp) * (sc.consensus_high - a.high_temp)) as msq_high,
+            AVG(sc.consensus_low - a.low_temp) as mean_low_bias,
+            AVG(ABS(sc.consensus_low - a.low_temp)) as mae_low,
+            AVG((sc.consensus_low - a.low_temp) * (sc.consensus_low - a.low_temp)) as msq_low
+        FROM spatial_consensus sc
+        INNER JOIN actuals a 
+            ON sc.city = a.city 
+            AND sc.target_date = a.date
+        WHERE sc.city = ?
+            AND sc.target_date BETWEEN ? AND ?
+            AND sc.grid_count >= 5
+        GROUP BY sc.forecast_horizon
+        ORDER BY sc.forecast_horizon
+        '''
+        
+        cursor = self._conn.execute(query, (city, start_date, end_date))
+        columns = [column[0] for column in cursor.description]
+        return columns, cursor.fetchall()
+    
+    def _bias_arrays(self, bias_df):
+        """Contiguous float64 high/low bias arrays for the stats kernel"""
+        # One frame-level selection; pandas keeps both columns in one block,
+        # so the transposed view is usually row-contiguous without a copy
+        block = bias_df[['high_bias', 'low_bias']].to_numpy(dtype=np.float64).T
+        high, low = np.ascontiguousarray(block)
+        return high, low
+    
     def aggregate_bias_metrics(self, bias_df):
         """
         Calculate aggregate bias statistics
@@ -78,21 +251,25 @@ class BiasAnalyzer:
             logger.warning("No data available for bias calculation")
             return {}
         
+        (mean_high, std_high, mae_high, rmse_high,
+         mean_low, std_low, mae_low, rmse_low) = bias_stats(*self._bias_arrays(bias_df))
+        
         metrics = {
             'n_days': len(bias_df),
-            'mean_high_bias': bias_df['high_bias'].mean(),
-            'std_high_bias': bias_df['high_bias'].std(),
-            'mean_low_bias': bias_df['low_bias'].mean(),
-            'std_low_bias': bias_df['low_bias'].std(),
-            'mae_high': bias_df['high_bias'].abs().mean(),
-            'mae_low': bias_df['low_bias'].abs().mean(),
-            'rmse_high': np.sqrt((bias_df['high_bias'] ** 2).mean()),
-            'rmse_low': np.sqrt((bias_df['low_bias'] ** 2).mean()),
+            'mean_high_bias': mean_high,
+            'std_high_bias': std_high,
+            'mean_low_bias': mean_low,
+            'std_low_bias': std_low,
+            'mae_high': mae_high,
+            'mae_low': mae_low,
+            'rmse_high': rmse_high,
+            'rmse_low': rmse_low,
         }
         
         return metrics
     
-    def detect_persistent_bias(self, bias_df, threshold=0.5, min_days=30):
+    def detect_persistent_bias(self, bias_df, threshold=DEFAULT_BIAS_THRESHOLD,
+                               min_days=DEFAULT_MIN_DAYS):
         """
         Detect persistent directional bias
         
@@ -111,8 +288,8 @@ class BiasAnalyzer:
                 'low_bias_detected': False
             }
         
-        mean_high_bias = bias_df['high_bias'].mean()
-        mean_low_bias = bias_df['low_bias'].mean()
+        # Only the means are needed, so skip the full statistics kernel
+        mean_high_bias, mean_low_bias = bias_means(*self._bias_arrays(bias_df))
         
         # Simple statistical test: is mean bias > threshold?
         # More sophisticated tests could be added (t-test, etc.)
@@ -138,8 +315,6 @@ class BiasAnalyzer:
         Returns:
             DataFrame with per-gridpoint forecasts
         """
-        conn = sqlite3.connect(self.db_path)
-        
         query = '''
         SELECT 
             grid_id,
@@ -154,10 +329,9 @@ class BiasAnalyzer:
         ORDER BY forecast_horizon, grid_id, grid_x, grid_y
         '''
         
-        df = pd.read_sql_query(query, conn, params=(city, target_date))
-        conn.close()
+        rows = self._conn.execute(query, (city, target_date)).fetchall()
         
-        return df
+        return pd.DataFrame(_typed_columns(rows, GRIDPOINT_COLUMNS))
     
     def export_summary_report(self, city, start_date, end_date, output_path):
         """
@@ -168,37 +342,88 @@ class BiasAnalyzer:
             start_date: Start date (YYYY-MM-DD)
             end_date: End date (YYYY-MM-DD)
             output_path: Path to save CSV report
+            
+        Returns:
+            List of per-horizon result dicts, as written to the CSV
         """
-        results = []
+        # Per-horizon aggregates come straight from SQLite; at most ten
+        # rows, so plain dicts and csv are cheaper than a DataFrame
+        columns, rows = self._aggregate_spatial_bias_rows(city, start_date, end_date)
         
-        # Analyze each forecast horizon
-        for horizon in range(0, 10):
-            bias_df = self.calculate_spatial_bias(city, start_date, end_date, horizon)
-            
-            if len(bias_df) == 0:
-                continue
-            
-            metrics = self.aggregate_bias_metrics(bias_df)
-            bias_detection = self.detect_persistent_bias(bias_df)
+        results = []
+        for row in rows:
+            summary = dict(zip(columns, row))
+            sufficient_data = summary['n_days'] >= DEFAULT_MIN_DAYS
+            mean_high_bias = summary['mean_high_bias']
+            mean_low_bias = summary['mean_low_bias']
             
             results.append({
                 'city': city,
-                'horizon_days': horizon,
-                'n_days': metrics.get('n_days', 0),
-                'mean_high_bias': metrics.get('mean_high_bias', None),
-                'mean_low_bias': metrics.get('mean_low_bias', None),
-                'mae_high': metrics.get('mae_high', None),
-                'mae_low': metrics.get('mae_low', None),
-                'high_bias_detected': bias_detection.get('high_bias_detected', False),
-                'low_bias_detected': bias_detection.get('low_bias_detected', False),
+                'horizon_days': summary['forecast_horizon'],
+                'n_days': summary['n_days'],
+                'mean_high_bias': mean_high_bias,
+                'mean_low_bias': mean_low_bias,
+                'mae_high': summary['mae_high'],
+                'mae_low': summary['mae_low'],
+                'high_bias_detected': (sufficient_data and mean_high_bias is not None
+                                       and abs(mean_high_bias) > DEFAULT_BIAS_THRESHOLD),
+                'low_bias_detected': (sufficient_data and mean_low_bias is not None
+                                      and abs(mean_low_bias) > DEFAULT_BIAS_THRESHOLD),
             })
         
         # Save results
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_path, index=False)
+        _write_report(output_path, results)
         logger.info(f"Report saved to {output_path}")
         
-        return results_df
+        return results
+    
+    def export_all_cities(self, cities, start_date, end_date, output_path, max_workers=None):
+        """
+        Generate summary reports for several cities in parallel
+        
+        Each city is reported by a separate process with its own read-only
+        connection; per-city CSVs are written next to output_path and then
+        merged into it.
+        
+        Args:
+            cities: Iterable of city identifiers
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            output_path: Path to save the combined CSV report
+            max_workers: Worker processes (defaults to one per CPU)
+            
+        Returns:
+            List of per-horizon result dicts for all cities
+        """
+        cities = list(cities)
+        base, ext = os.path.splitext(output_path)
+        jobs = [
+            (self.db_path, city, start_date, end_date, f"{base}_{city}{ext}")
+            for city in cities
+        ]
+        
+        results = []
+        if jobs:
+            workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for city_results in executor.map(_export_city, jobs):
+                    results.extend(city_results)
+        
+        _write_report(output_path, results)
+        logger.info(f"Combined report for {len(cities)} cities saved to {output_path}")
+        
+        return results
+
+
+def _export_city(job):
+    """Process pool worker: summary report for one city"""
+    db_path, city, start_date, end_date, output_path = job
+    analyzer = BiasAnalyzer(db_path, read_only=True)
+    
+    try:
+        return analyzer.export_summary_report(city, start_date, end_date, output_path)
+    finally:
+        analyzer.close()
 
 
 def main():
@@ -227,6 +452,8 @@ def main():
             print(f"  {key}: {value}")
     else:
         print(f"No data available for {city}")
+    
+    analyzer.close()
 
 
 if __name__ == '__main__':
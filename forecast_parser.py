@@ -0,0 +1,104 @@
+"""
+Forecast Page Parser
+Extracts per-day forecast columns from a Weather Underground forecast page
+
+Fully type-annotated so it can be compiled to a C extension with mypyc
+(see setup.py). Without a compiled build this module runs as plain Python.
+
+NOTE: The CSS selectors below are PLACEHOLDERS and must be customized for
+the current Weather Underground website structure.
+"""
+
+import logging
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+logger = logging.getLogger(__name__)
+
+# TODO: Update these selectors based on current WU structure
+# These are PLACEHOLDERS and will need to be customized
+FORECAST_DAY_SELECTOR = '.forecast-day'
+DATE_SELECTOR = '.date-selector'
+HIGH_TEMP_SELECTOR = '.high-temp'
+LOW_TEMP_SELECTOR = '.low-temp'
+CONDITIONS_SELECTOR = '.conditions'
+PRECIP_SELECTOR = '.precipitation-chance'
+
+# First signed number in a temperature label such as '72°F' or '-3.5°'
+TEMP_RE = re.compile(r'-?\d+\.?\d*')
+
+# Parallel per-day columns: (target_date, forecast_horizon, high_temp,
+# low_temp, conditions, precipitation_chance)
+ForecastDays = Tuple[
+    List[str], List[int], List[Optional[float]], List[Optional[float]],
+    List[str], List[Optional[int]]
+]
+
+
+def parse_forecast_page(html: bytes, today: date, max_days: int = 10) -> ForecastDays:
+    """
+    Parse up to max_days of forecasts from raw forecast page bytes
+
+    Args:
+        html: Page body as bytes
+        today: Date of horizon 0; later days are offsets from it
+        max_days: Maximum number of forecast days to collect
+
+    Returns:
+        ForecastDays tuple of parallel per-day lists
+    """
+    tree = LexborHTMLParser(html)
+    forecast_days = tree.css(FORECAST_DAY_SELECTOR)
+
+    target_dates: List[str] = []
+    horizons: List[int] = []
+    high_temps: List[Optional[float]] = []
+    low_temps: List[Optional[float]] = []
+    conditions_list: List[str] = []
+    precip_chances: List[Optional[int]] = []
+
+    for idx, day_elem in enumerate(forecast_days[:max_days]):
+        date_elem = day_elem.css_first(DATE_SELECTOR)
+        conditions_elem = day_elem.css_first(CONDITIONS_SELECTOR)
+        if date_elem is None or conditions_elem is None:
+            logger.warning(f"Failed to parse day {idx}: missing date or conditions")
+            continue
+
+        target_dates.append((today + timedelta(days=idx)).isoformat())
+        horizons.append(idx)
+        high_temps.append(extract_temp(day_elem, HIGH_TEMP_SELECTOR))
+        low_temps.append(extract_temp(day_elem, LOW_TEMP_SELECTOR))
+        conditions_list.append(conditions_elem.text())
+        precip_chances.append(extract_precip(day_elem))
+
+    return target_dates, horizons, high_temps, low_temps, conditions_list, precip_chances
+
+
+def extract_temp(element: LexborNode, selector: str) -> Optional[float]:
+    """Extract temperature from element"""
+    # TODO: Implement based on current WU structure
+    try:
+        temp_elem = element.css_first(selector)
+        if temp_elem is not None:
+            match = TEMP_RE.search(temp_elem.text())
+            if match:
+                return float(match.group())
+    except Exception:
+        pass
+    return None
+
+
+def extract_precip(element: LexborNode) -> Optional[int]:
+    """Extract precipitation chance from element"""
+    # TODO: Implement based on current WU structure
+    try:
+        precip_elem = element.css_first(PRECIP_SELECTOR)
+        if precip_elem is not None:
+            precip_text = precip_elem.text().strip().replace('%', '')
+            return int(precip_text)
+    except Exception:
+        pass
+    return None
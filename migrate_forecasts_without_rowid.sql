@@ -0,0 +1,48 @@
+-- One-time migration: rebuild forecasts as a WITHOUT ROWID table
+-- For databases created before the forecasts primary key change.
+-- Apply once, then re-run schema.sql to recreate the indexes and views:
+--
+--   sqlite3 weather_forecasts.db < migrate_forecasts_without_rowid.sql
+--   sqlite3 weather_forecasts.db < schema.sql
+
+BEGIN;
+
+-- Views reference forecasts and would block the rename below
+DROP VIEW IF EXISTS forecast_accuracy;
+DROP VIEW IF EXISTS spatial_consensus;
+
+CREATE TABLE forecasts_v2 (
+    city TEXT NOT NULL,
+    grid_id TEXT NOT NULL,
+    grid_x INTEGER NOT NULL,
+    grid_y INTEGER NOT NULL,
+    forecast_time TEXT NOT NULL,
+    target_date TEXT NOT NULL,
+    forecast_horizon INTEGER NOT NULL,
+    high_temp REAL,
+    low_temp REAL,
+    conditions TEXT,
+    precipitation_chance INTEGER,
+    source TEXT NOT NULL,
+    collected_at TEXT NOT NULL,
+    PRIMARY KEY (city, grid_id, grid_x, grid_y, target_date, forecast_time, source)
+) WITHOUT ROWID;
+
+INSERT INTO forecasts_v2 (
+    city, grid_id, grid_x, grid_y,
+    forecast_time, target_date, forecast_horizon,
+    high_temp, low_temp, conditions, precipitation_chance,
+    source, collected_at
+)
+SELECT
+    city, grid_id, grid_x, grid_y,
+    forecast_time, target_date, forecast_horizon,
+    high_temp, low_temp, conditions, precipitation_chance,
+    source, collected_at
+FROM forecasts;
+
+-- Dropping the old table also drops its indexes; schema.sql recreates them
+DROP TABLE forecasts;
+ALTER TABLE forecasts_v2 RENAME TO forecasts;
+
+COMMIT;
@@ -2,9 +2,9 @@
 -- Supports multi-city spatial ensemble framework with temporal tracking
 
 -- Forecasts table: stores weather predictions with spatial and temporal metadata
+-- WITHOUT ROWID: the deduplication key is the primary key, so each insert
+-- maintains a single b-tree instead of a rowid table plus a unique index
 CREATE TABLE IF NOT EXISTS forecasts (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    
     -- Spatial identifiers
     city TEXT NOT NULL,
     grid_id TEXT NOT NULL,
@@ -27,8 +27,8 @@ CREATE TABLE IF NOT EXISTS forecasts (
     collected_at TEXT NOT NULL,       -- Timestamp of data collection
     
     -- Deduplication support
-    UNIQUE(city, grid_id, grid_x, grid_y, target_date, forecast_time, source)
-);
+    PRIMARY KEY (city, grid_id, grid_x, grid_y, target_date, forecast_time, source)
+) WITHOUT ROWID;
 
 -- Indexes for efficient querying
 CREATE INDEX IF NOT EXISTS idx_forecasts_city_target 
@@ -37,6 +37,11 @@ CREATE INDEX IF NOT EXISTS idx_forecasts_city_target
 CREATE INDEX IF NOT EXISTS idx_forecasts_horizon 
     ON forecasts(forecast_horizon);
     
+-- Partial index matching the spatial_consensus view filter
+CREATE INDEX IF NOT EXISTS idx_forecasts_city_horizon_target 
+    ON forecasts(city, forecast_horizon, target_date)
+    WHERE high_temp IS NOT NULL AND low_temp IS NOT NULL;
+    
 CREATE INDEX IF NOT EXISTS idx_forecasts_grid 
     ON forecasts(grid_id, grid_x, grid_y);
     
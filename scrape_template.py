@@ -3,17 +3,22 @@
 Weather Underground Scraper Template
 Collects forecast data for spatial ensemble bias detection
 
-NOTE: This template requires customization of CSS selectors based on the
-current Weather Underground website structure. Selectors change frequently.
+NOTE: This template requires customization of CSS selectors (in
+forecast_parser.py) based on the current Weather Underground website
+structure. Selectors change frequently.
 """
 
+import asyncio
 import sqlite3
+from collections import namedtuple
+from itertools import repeat
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import time
+from datetime import datetime
 import logging
 
+from forecast_parser import parse_forecast_page
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +26,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Only advertise Brotli when a decoder is installed; requests and httpx
+# decode gzip/deflate natively and pick up brotli transparently
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
+
+# Column-oriented staging buffer for one gridpoint's parsed forecasts:
+# per-grid fields are scalars, per-day fields are parallel lists
+ForecastColumns = namedtuple('ForecastColumns', [
+    'city', 'grid_id', 'grid_x', 'grid_y', 'forecast_time', 'source',
+    'target_date', 'forecast_horizon', 'high_temp', 'low_temp',
+    'conditions', 'precipitation_chance'
+])
+
+# One shared string so sqlite3's statement cache reuses the prepared insert
+INSERT_SQL = '''
+    INSERT OR IGNORE INTO forecasts (
+        city, grid_id, grid_x, grid_y,
+        forecast_time, target_date, forecast_horizon,
+        high_temp, low_temp, conditions, precipitation_chance,
+        source, collected_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 
 class WeatherScraper:
     """Template for scraping weather forecasts"""
@@ -28,9 +64,25 @@ class WeatherScraper:
     def __init__(self, db_path='weather_forecasts.db'):
         self.db_path = db_path
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.session.headers.update(DEFAULT_HEADERS)
+        
+        # Autocommit mode so each batch runs in one explicit transaction
+        self._conn = sqlite3.connect(db_path, isolation_level=None,
+                                     check_same_thread=False, cached_statements=512)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA cache_size=10000')
+    
+    def close(self):
+        """Close the HTTP session and cached database connection"""
+        self.session.close()
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            conn.close()
+            self._conn = None
+    
+    def __del__(self):
+        self.close()
     
     def scrape_forecast(self, city, grid_id, grid_x, grid_y, lat, lon):
         """
@@ -45,120 +97,132 @@ class WeatherScraper:
             lon: Longitude for Weather Underground lookup
         """
         try:
-            # Construct Weather Underground URL
-            # TODO: Verify current URL format for WU
-            url = f"https://www.wunderground.com/forecast/{lat},{lon}"
+            url = self._forecast_url(lat, lon)
             
             logger.info(f"Fetching {city} forecast for grid {grid_id}/{grid_x}/{grid_y}")
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # TODO: Update these selectors based on current WU structure
-            # These are PLACEHOLDERS and will need to be customized
-            forecast_days = soup.select('.forecast-day')  # UPDATE SELECTOR
-            
-            forecasts = []
-            forecast_time = datetime.now().isoformat()
-            
-            for idx, day_elem in enumerate(forecast_days[:10]):  # Collect 10-day forecast
-                try:
-                    # TODO: Update all these selectors
-                    date_str = day_elem.select_one('.date-selector').text  # UPDATE
-                    high_temp = self._extract_temp(day_elem, '.high-temp')  # UPDATE
-                    low_temp = self._extract_temp(day_elem, '.low-temp')    # UPDATE
-                    conditions = day_elem.select_one('.conditions').text    # UPDATE
-                    precip = self._extract_precip(day_elem)                 # UPDATE
-                    
-                    # Calculate target date
-                    target_date = (datetime.now() + timedelta(days=idx)).strftime('%Y-%m-%d')
-                    
-                    forecasts.append({
-                        'city': city,
-                        'grid_id': grid_id,
-                        'grid_x': grid_x,
-                        'grid_y': grid_y,
-                        'forecast_time': forecast_time,
-                        'target_date': target_date,
-                        'forecast_horizon': idx,
-                        'high_temp': high_temp,
-                        'low_temp': low_temp,
-                        'conditions': conditions,
-                        'precipitation_chance': precip,
-                        'source': 'weather_underground'
-                    })
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to parse day {idx}: {e}")
-                    continue
+            columns = self._parse_forecasts(response.content, city, grid_id, grid_x, grid_y)
             
             # Save to database
-            self._save_forecasts(forecasts)
-            return len(forecasts)
+            self._save_forecasts(columns)
+            return len(columns.target_date)
             
         except Exception as e:
             logger.error(f"Error scraping {city} ({grid_id}/{grid_x}/{grid_y}): {e}")
             return 0
     
-    def _extract_temp(self, element, selector):
-        """Extract temperature from element"""
-        # TODO: Implement based on current WU structure
-        try:
-            temp_elem = element.select_one(selector)
-            if temp_elem:
-                temp_text = temp_elem.text.strip().replace('°', '').replace('F', '')
-                return float(temp_text)
-        except:
-            pass
-        return None
-    
-    def _extract_precip(self, element):
-        """Extract precipitation chance from element"""
-        # TODO: Implement based on current WU structure
-        try:
-            precip_elem = element.select_one('.precipitation-chance')  # UPDATE
-            if precip_elem:
-                precip_text = precip_elem.text.strip().replace('%', '')
-                return int(precip_text)
-        except:
-            pass
-        return None
-    
-    def _save_forecasts(self, forecasts):
-        """Save forecasts to database with deduplication"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    async def scrape_forecast_async(self, client, semaphore, city, grid_id, grid_x, grid_y, lat, lon):
+        """
+        Scrape forecast for a specific NOAA gridpoint without blocking
         
-        for forecast in forecasts:
+        Args:
+            client: Shared httpx.AsyncClient
+            semaphore: asyncio.Semaphore bounding concurrent requests
+            city, grid_id, grid_x, grid_y, lat, lon: As for scrape_forecast
+        """
+        async with semaphore:
             try:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO forecasts (
-                        city, grid_id, grid_x, grid_y,
-                        forecast_time, target_date, forecast_horizon,
-                        high_temp, low_temp, conditions, precipitation_chance,
-                        source, collected_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    forecast['city'],
-                    forecast['grid_id'],
-                    forecast['grid_x'],
-                    forecast['grid_y'],
-                    forecast['forecast_time'],
-                    forecast['target_date'],
-                    forecast['forecast_horizon'],
-                    forecast['high_temp'],
-                    forecast['low_temp'],
-                    forecast['conditions'],
-                    forecast['precipitation_chance'],
-                    forecast['source'],
-                    datetime.now().isoformat()
-                ))
+                url = self._forecast_url(lat, lon)
+                
+                logger.info(f"Fetching {city} forecast for grid {grid_id}/{grid_x}/{grid_y}")
+                response = await client.get(url)
+                response.raise_for_status()
+                
+                columns = self._parse_forecasts(response.content, city, grid_id, grid_x, grid_y)
+                
+                # Save to database
+                self._save_forecasts(columns)
+                return len(columns.target_date)
+                
             except Exception as e:
-                logger.error(f"Database insert error: {e}")
+                logger.error(f"Error scraping {city} ({grid_id}/{grid_x}/{grid_y}): {e}")
+                return 0
+            
+            finally:
+                await asyncio.sleep(2)  # Rate limiting, per concurrency slot
+    
+    async def scrape_grids_async(self, grids, concurrency=8):
+        """
+        Scrape many gridpoints concurrently over one HTTP/2 connection pool
+        
+        Args:
+            grids: Iterable of dicts with scrape_forecast keyword arguments
+            concurrency: Maximum number of requests in flight
+            
+        Returns:
+            List of forecast counts, one per grid
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async with httpx.AsyncClient(http2=True, timeout=10, headers=DEFAULT_HEADERS) as client:
+            return await asyncio.gather(*[
+                self.scrape_forecast_async(client, semaphore, **grid)
+                for grid in grids
+            ])
+    
+    def _forecast_url(self, lat, lon):
+        """Weather Underground forecast URL for a location"""
+        # TODO: Verify current URL format for WU
+        return f"https://www.wunderground.com/forecast/{lat},{lon}"
+    
+    def _parse_forecasts(self, html, city, grid_id, grid_x, grid_y):
+        """Parse up to 10 days of forecasts from raw forecast page bytes"""
+        # One clock read per page; target dates are offsets from it
+        now = datetime.now()
+        (target_dates, horizons, high_temps, low_temps,
+         conditions, precip_chances) = parse_forecast_page(html, now.date())
+        
+        return ForecastColumns(
+            city=city,
+            grid_id=grid_id,
+            grid_x=grid_x,
+            grid_y=grid_y,
+            forecast_time=now.isoformat(),
+            source='weather_underground',
+            target_date=target_dates,
+            forecast_horizon=horizons,
+            high_temp=high_temps,
+            low_temp=low_temps,
+            conditions=conditions,
+            precipitation_chance=precip_chances
+        )
+    
+    def _save_forecasts(self, columns):
+        """
+        Save a ForecastColumns batch to database with deduplication
+        
+        Uniqueness is enforced by the forecasts primary key (the table is
+        WITHOUT ROWID), so INSERT OR IGNORE deduplicates against that single
+        b-tree without a secondary unique index.
+        """
+        rows = zip(
+            repeat(columns.city),
+            repeat(columns.grid_id),
+            repeat(columns.grid_x),
+            repeat(columns.grid_y),
+            repeat(columns.forecast_time),
+            columns.target_date,
+            columns.forecast_horizon,
+            columns.high_temp,
+            columns.low_temp,
+            columns.conditions,
+            columns.precipitation_chance,
+            repeat(columns.source),
+            repeat(datetime.now().isoformat())
+        )
         
-        conn.commit()
-        conn.close()
+        cursor = self._conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN')
+            cursor.executemany(INSERT_SQL, rows)
+            cursor.execute('COMMIT')
+        except Exception as e:
+            if self._conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            logger.error(f"Database insert error: {e}")
 
 
 def main():
@@ -178,16 +242,10 @@ def main():
         }
     ]
     
-    for grid in example_grids:
-        scraper.scrape_forecast(
-            city=grid['city'],
-            grid_id=grid['grid_id'],
-            grid_x=grid['grid_x'],
-            grid_y=grid['grid_y'],
-            lat=grid['lat'],
-            lon=grid['lon']
-        )
-        time.sleep(2)  # Rate limiting
+    # Fetch all gridpoints concurrently; use scrape_forecast for one-off calls
+    asyncio.run(scraper.scrape_grids_async(example_grids))
+    
+    scraper.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,17 @@
+"""
+Optional build: compile the forecast page parser to a C extension with mypyc
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+The compiled module is picked up in place of forecast_parser.py; without
+this step the scraper imports the plain Python module.
+"""
+
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name='forecast_parser',
+    ext_modules=mypycify(['forecast_parser.py']),
+)